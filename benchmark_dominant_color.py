@@ -0,0 +1,41 @@
+"""Benchmark of histogram dominant color against k-means mean color"""
+import time
+
+import numpy as np
+import cv2 as cv
+
+import constants
+import preprocessing
+import dominant_color
+
+SIZES = [512, 1024, 2048, 4096]
+REPEATS = 3
+
+
+def best_time(function, image) -> (float, np.array):
+    """Returns the best of REPEATS run times in ms and the result"""
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = function(image)
+        times.append((time.perf_counter() - start) * 1000)
+    return min(times), result
+
+
+image = cv.imread(constants.INPUT_IMG_NAME, cv.IMREAD_COLOR)
+image = cv.cvtColor(image, cv.COLOR_BGR2RGB)
+print(f"{'size':>10} {'k-means, ms':>12} {'histogram, ms':>14} "
+      f"{'full histogram, ms':>19}  mean / dominant color")
+for size in SIZES:
+    resized = cv.resize(image, (size, size))
+    kmeans_time, mean = best_time(preprocessing.get_mean_color, resized)
+    histogram_time, dominant = best_time(dominant_color.dominant_color, resized)
+    full_time, _ = best_time(
+        lambda img: dominant_color.dominant_color(img, step=1), resized)
+    print(f"{size:>4}x{size:<5} {kmeans_time:>12.1f} {histogram_time:>14.1f} "
+          f"{full_time:>19.1f}  {mean} / {dominant}")
+
+colors, shares = dominant_color.palette(image, k=5)
+print("\nTop-5 palette of", constants.INPUT_IMG_NAME)
+for color, share in zip(colors, shares):
+    print(color, f"{share:.1%}")
@@ -1,9 +1,26 @@
 """Module that contains constants, needed in the algorithm. Can be treated as config file"""
 INPUT_IMG_NAME = "input/unnamed.png"
-IMAGE_WIDTH = 512
-IMAGE_HEIGHT = 512
+
+# Resolution of the final picture. Any aspect ratio is allowed
+OUTPUT_WIDTH = 512
+OUTPUT_HEIGHT = 512
+
+# Evolution runs on a working canvas with the output aspect ratio, whose
+# longest side is capped by WORKING_MAX_SIZE. Figure coordinates are given
+# in working canvas pixels
+WORKING_MAX_SIZE = 512
+WORKING_SCALE = min(1, WORKING_MAX_SIZE / max(OUTPUT_WIDTH, OUTPUT_HEIGHT))
+IMAGE_WIDTH = round(OUTPUT_WIDTH * WORKING_SCALE)
+IMAGE_HEIGHT = round(OUTPUT_HEIGHT * WORKING_SCALE)
 IMAGE_SIZE = [IMAGE_WIDTH, IMAGE_HEIGHT]
 
+# Final picture is rendered by tiles of RENDER_TILE_SIZE x RENDER_TILE_SIZE
+# pixels in RENDER_WORKERS processes (None - number of CPUs). Each tile is
+# supersampled RENDER_SUPERSAMPLING times for antialiasing
+RENDER_TILE_SIZE = 512
+RENDER_WORKERS = None
+RENDER_SUPERSAMPLING = 2
+
 VERBOSE_MODE = True
 SHOW_ITERATIONS = False
 
@@ -11,4 +28,76 @@ START_UNITS = 100
 ITERATIONS = 1000
 SEED = None
 
+# Skip rendering of children, that can not survive even with perfect
+# approximation of the target
+LAZY_FITNESS = True
+
+# Find invisible figures by rasterizing figure indices on a canvas, scaled by
+# ID_BUFFER_SCALE, instead of pairwise analytic covering tests. Raster test
+# also catches figures covered by several others together. Figures, that have
+# no pixels on the scaled canvas, are checked again at full resolution, so
+# only really invisible ones are removed. Intersection fitness then counts
+# pairs of figures, whose visible parts touch on the scaled canvas
+ID_BUFFER = False
+ID_BUFFER_SCALE = 0.25
+
+# Seed racing (race.py): RACE_SEEDS populations with seeds SEED, SEED+1, ...
+# run RACE_ROUND_ITERATIONS iterations in the first round. After each round
+# the worse half is dropped and the round budget per population is doubled.
+# The winner is then run up to ITERATIONS in total
+RACE_SEEDS = 8
+RACE_ROUND_ITERATIONS = 125
+
+# Color new figures by mean target color of their bounding box instead of
+# target color at their center. Mean colors are closer to the target, but
+# less contrast, which costs more fitness than it brings by default weights.
+# Color mutation steps towards the mean color regardless of this flag
+REGION_COLORED_FIGURES = False
+# Share of color mutations, that step towards the mean target color of the
+# figure bounding box. Others change the color randomly
+TARGETED_COLOR_P = 1 / 3
+
+# Preprocessed targets are cached in TARGET_CACHE_DIR, keyed by file content,
+# least recently used ones are evicted above TARGET_CACHE_MAX_BYTES
+TARGET_CACHE = True
+TARGET_CACHE_DIR = "output/cache"
+TARGET_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Best figures of every run are kept in RESULT_STORE_DIR. If WARM_START is
+# set, WARM_START_FRACTION of initial generation is seeded from results of
+# WARM_START_NEIGHBORS most similar previous targets, whose descriptors are
+# closer than WARM_START_MAX_DISTANCE. Figures of targets, that are farther
+# than WARM_START_RECOLOR_DISTANCE, are recolored from the new target, closer
+# ones keep their colors. Warm start makes result depend on the store
+# content, not only on SEED, so it is off by default
+RESULT_STORE_DIR = "output/store"
+WARM_START = False
+WARM_START_MAX_DISTANCE = 0.35
+WARM_START_RECOLOR_DISTANCE = 0.1
+WARM_START_FRACTION = 0.2
+WARM_START_NEIGHBORS = 3
+
+# Sequence mode (sequence.py): SEQUENCE_INPUT is a video file or a directory
+# of frame images. First frame gets ITERATIONS iterations, each next one
+# continues population of the previous frame for SEQUENCE_ITERATIONS more
+SEQUENCE_INPUT = "input/sequence"
+SEQUENCE_ITERATIONS = 100
+SEQUENCE_OUTPUT_DIR = "output/sequence"
+
+# Job server (server.py): JSON lines over TCP on SERVER_HOST:SERVER_PORT.
+# SERVER_WORKERS warm worker processes take jobs from a queue of at most
+# SERVER_QUEUE_SIZE waiting jobs. Progress is reported every
+# SERVER_PROGRESS_ITERATIONS iterations, which also bounds cancel latency
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
+SERVER_WORKERS = 2
+SERVER_QUEUE_SIZE = 16
+SERVER_PROGRESS_ITERATIONS = 10
+SERVER_MAX_MESSAGE = 64 * 1024 * 1024
+
+# Load test (load_test.py) against running job server
+LOAD_TEST_JOBS = 20
+LOAD_TEST_CONCURRENCY = 4
+LOAD_TEST_ITERATIONS = 50
+
 SHOW_RESULT = False
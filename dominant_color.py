@@ -0,0 +1,53 @@
+"""Fast dominant color and palette estimation by 3D color histogram"""
+import numpy as np
+
+BITS = 5
+BINS = 1 << (3 * BITS)
+# Images with more pixels are subsampled on a regular grid by default
+MAX_SAMPLES = 1 << 18
+
+
+def _samples(image: np.array, step: int = None) -> np.array:
+    """Returns pixels of image as (n, 3) uint8 array, taking every step-th
+    pixel along both axes. Step is chosen by MAX_SAMPLES, if not given"""
+    if step is None:
+        pixels_number = image.shape[0] * image.shape[1]
+        step = max(int(np.sqrt(pixels_number / MAX_SAMPLES)), 1)
+    return np.asarray(image[::step, ::step, :3], dtype=np.uint8).reshape(-1, 3)
+
+
+def _pack(pixels: np.array) -> np.array:
+    """Pack quantized channels into one histogram bin index"""
+    quantized = (pixels >> (8 - BITS)).astype(np.int32)
+    return (quantized[:, 0] << (2 * BITS)) | (quantized[:, 1] << BITS) \
+        | quantized[:, 2]
+
+
+def palette(image: np.array, k: int = 5, step: int = None):
+    """Returns k most frequent colors of image, most frequent first, and
+    their shares of image.\\
+    Colors are quantized to BITS bits per channel for counting, each returned
+    color is mean of the image pixels in its histogram bin"""
+    pixels = _samples(image, step)
+    packed = _pack(pixels)
+    counts = np.bincount(packed, minlength=BINS)
+
+    k = min(k, int(np.count_nonzero(counts)))
+    top = np.argpartition(counts, -k)[-k:]
+    top = top[np.argsort(counts[top])[::-1]]
+
+    # Mean color of pixels, that fall into top bins
+    is_top = np.zeros(BINS, dtype=bool)
+    is_top[top] = True
+    in_top = is_top[packed]
+    sums = np.stack([np.bincount(packed[in_top], weights=pixels[in_top, i],
+                                 minlength=BINS)[top] for i in range(0, 3)],
+                    axis=1)
+    colors = np.uint8(np.round(sums / counts[top, None]))
+    return colors, counts[top] / len(packed)
+
+
+def dominant_color(image: np.array, step: int = None) -> np.array:
+    """Returns the most frequent (quantized) color of image"""
+    colors, _ = palette(image, k=1, step=step)
+    return colors[0]
@@ -0,0 +1,206 @@
+"""Input preparation, evolutionary loop and result output, shared by run modes"""
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+from skimage import io
+import matplotlib.pyplot as plt
+import cv2 as cv
+
+from unit import Unit
+from figures import Figure
+import unit
+import constants
+import preprocessing
+import fitness_helper_functions as fit
+import render
+from result_store import ResultStore
+from target_cache import TargetCache
+
+
+def prepare_target(image_name: str = None):
+    """Read and preprocess target image, create canvas and setup fitness
+    function parameters. Returns target image and blank canvas"""
+    image_name = image_name or constants.INPUT_IMG_NAME
+    with open(image_name, "rb") as file:
+        return load_target(file.read())
+
+
+def load_target(data: bytes):
+    """Same as prepare_target(), but for content of image file.\\
+    If TARGET_CACHE is set, preprocessed target, its dominant color and
+    background metrics are taken from cache, or saved to it"""
+    cache = TargetCache() if constants.TARGET_CACHE else None
+    if cache is not None:
+        key = cache.key(data)
+        cached = cache.load(key)
+        if cached is not None:
+            target_image, background, metrics = cached
+            blank_image = preprocessing.get_blank(background)
+            fit.setup_fitness_parameters(target_image, blank_image[0][0],
+                                         blank_image, optimal_figures_number=12,
+                                         background_metrics=metrics)
+            return target_image, blank_image
+
+    image = cv.imdecode(np.frombuffer(data, dtype=np.uint8), cv.IMREAD_UNCHANGED)
+    if image is None:
+        raise ValueError("Can not decode image")
+    target_image, blank_image = setup_target(image)
+    if cache is not None:
+        cache.store(key, target_image, blank_image[0][0],
+                    {name: fit.FITNESS_PARAMETERS[name]
+                     for name in fit.BACKGROUND_METRICS})
+    return target_image, blank_image
+
+
+def setup_target(image, background=None):
+    """Preprocess BGR(A) image, as it is read by OpenCV, create canvas and
+    setup fitness function parameters. Returns target image and blank canvas.\\
+    If background color is not given, dominant color of image is used"""
+    image = cv.resize(image, (constants.IMAGE_WIDTH, constants.IMAGE_HEIGHT))
+    image = cv.cvtColor(image, cv.COLOR_BGR2RGB)
+
+    target_image = preprocessing.rgba2rgb(image)
+    # Create canvas
+    if background is None:
+        background = preprocessing.get_dominant_color(target_image)
+    blank_image = preprocessing.get_blank(background)
+
+    # Setup fitness function parameters
+    fit.setup_fitness_parameters(target_image, blank_image[0][0], blank_image,
+                                 optimal_figures_number=12)
+    return target_image, blank_image
+
+
+class Population:
+    """Generation of units, evolving from its own random seed.\\
+    All random decisions are drawn from generator of the population, and units
+    of initial generation get their own generators, spawned from it. So the
+    result depends only on seed, and several populations can be advanced
+    in turns, each giving the same result as a standalone run.\\
+    If seed_figures are given, part of initial generation (WARM_START_FRACTION)
+    is made of them: exact copies first, mutated copies after that"""
+
+    def __init__(self, seed: int, start_units: int = None,
+                 seed_figures: List[List[Figure]] = None):
+        self.seed = seed
+        self.iterations = 0
+        # Children evaluated, and children whose rendering was skipped
+        self.evaluated = 0
+        self.skipped = 0
+        self.rng = np.random.default_rng(np.random.SeedSequence(seed))
+        start_units = start_units or constants.START_UNITS
+        unit_rngs = self.rng.spawn(start_units)
+        self.generation = []
+        if seed_figures:
+            warm_units = int(start_units * constants.WARM_START_FRACTION)
+            for i in range(0, warm_units):
+                warm_unit = Unit(figures=[
+                    fig.copy() for fig in seed_figures[i % len(seed_figures)]])
+                if i >= len(seed_figures):
+                    warm_unit.mutate(unit.draw_mutations(unit_rngs[i], 1)[0])
+                self.generation.append(warm_unit)
+        self.generation += [Unit(rng=unit_rng)
+                            for unit_rng in unit_rngs[len(self.generation):]]
+        # (iterations done, best fitness) after each step
+        self.trajectory = [(0, self.best().fitness_val)]
+
+    def step(self, iterations: int, verbose: bool = False) -> None:
+        """Run given number of iterations of evolutionary loop"""
+        one_percent = max(int(iterations / 100), 1)
+
+        for i in range(0, iterations):
+
+            if i % one_percent == 0 and verbose:
+                print(f"{i / one_percent}%")
+
+            # If only one unit left - break
+            if len(self.generation) < 2:
+                break
+
+            parents = [self.pop_parent(), self.pop_parent()]
+            # Only 2 best of parents and children survive, so a child that
+            # can not beat both parents is not worth rendering
+            threshold = None
+            if constants.LAZY_FITNESS:
+                threshold = min(p.fitness_val for p in parents)
+            children = parents[0].make_children_with(
+                parents[1], self.rng, threshold=threshold)
+            self.evaluated += len(children)
+            self.skipped += sum(not c.fitness_exact for c in children)
+
+            to_be_removed = parents + children
+            to_be_removed = sorted(to_be_removed, key=unit.unit_comparator_metric)
+
+            self.generation += to_be_removed[-2:]
+
+        self.iterations += iterations
+        self.trajectory.append((self.iterations, self.best().fitness_val))
+
+    def skip_rate(self) -> float:
+        """Share of children, whose rendering was skipped by lazy fitness"""
+        return self.skipped / max(self.evaluated, 1)
+
+    def pop_parent(self) -> Unit:
+        """Remove from generation and return unit, chosen with probability
+        proportional to its fitness"""
+        weights = np.asarray([u.fitness_val for u in self.generation])
+        if weights.sum() > 0:
+            index = self.rng.choice(len(weights), p=weights / weights.sum())
+        else:
+            index = self.rng.integers(len(weights))
+        return self.generation.pop(index)
+
+    def retarget(self) -> None:
+        """Re-evaluate fitness of all units after target has been changed"""
+        for item in self.generation:
+            item.fitness_val = item.fitness()
+
+    def best(self) -> Unit:
+        """Returns unit with the highest fitness"""
+        best = None
+        best_fitness = 0
+        for item in self.generation:
+            if (best is None) or (item.fitness_val > best_fitness):
+                best = item
+                best_fitness = item.fitness_val
+        return best
+
+
+def warm_start_figures(target_image) -> List[List[Figure]]:
+    """Returns adapted figure lists of the most similar previous results, if
+    warm start is enabled. Results of unrelated targets are not used"""
+    if not constants.WARM_START:
+        return None
+    table = None
+    if constants.REGION_COLORED_FIGURES:
+        table = fit.FITNESS_PARAMETERS["TARGET_TABLE"]
+    return ResultStore().seed_figures(target_image, constants.WARM_START_NEIGHBORS,
+                                      table, constants.WARM_START_MAX_DISTANCE,
+                                      constants.WARM_START_RECOLOR_DISTANCE)
+
+
+def save_result(best: Unit, target_image, blank_image, name: str) -> None:
+    """Render best unit at output resolution, save it and its side-by-side
+    comparison with target into output folder. Add it to result store"""
+    # Create directories for output
+    Path("output/combined").mkdir(parents=True, exist_ok=True)
+
+    DPI = 80
+    render_start = time.time()
+    drawn = render.render(best.figures, blank_image[0][0])
+    print("Rendering", f"{constants.OUTPUT_WIDTH}x{constants.OUTPUT_HEIGHT}:",
+          "Done in", time.time() - render_start, "sec")
+
+    plt.gcf().set_size_inches(2048/DPI, 1024/DPI)
+    plt.subplot(1, 2, 1)
+    plt.imshow(drawn)
+    plt.subplot(1, 2, 2)
+    plt.imshow(target_image)
+    plt.savefig("output/combined/" + name + ".png")
+
+    io.imsave("output/" + name + ".png", drawn)
+    ResultStore().add(name, target_image, best.figures)
+    if constants.SHOW_RESULT:
+        plt.show()
@@ -1,15 +1,13 @@
 """Suprematism figures classes"""
 from copy import copy
-import random as rand
-from random import randint
 from enum import Enum
 from math import sin, cos, radians
 from skimage import draw
 import numpy as np
 
-import unit
 import constants
 import geometry_helper_functions as geo
+from summed_area import SummedAreaTable
 
 
 class FigureType(Enum):
@@ -22,7 +20,7 @@ class FigureType(Enum):
 
 class Figure:
     """Base class for figures. Should never be instantiated"""
-    MAX_SIZE = [256, 256]
+    MAX_SIZE = [min(constants.IMAGE_SIZE) // 2] * 2
     MIN_SIZE = [30, 30]
     figure_type = None
 
@@ -46,6 +44,13 @@ class Figure:
 
         return abs(polygon_area - area_from_external_point) < 1e-5
 
+    def bounds(self) -> (int, int, int, int):
+        """Returns bounding box (x0, y0, x1, y1) of figure, x1 and y1 exclusive"""
+        center = self.data.center
+        radius = self.data.radius
+        return (int(center[0] - radius), int(center[1] - radius),
+                int(center[0] + radius) + 1, int(center[1] + radius) + 1)
+
     def translate(self, translation_vector: [int, int]) -> None:
         """Moves figure by translation vector, by changing its center coordinates"""
         self.data.center += np.asarray(translation_vector)
@@ -56,7 +61,8 @@ class Figure:
             self.data.center, a_min=lower_bound, a_max=upper_bound)
 
     def delta_scale(self, delta:float):
-        tmp = [512 - item for item in self.data.center]
+        tmp = [constants.IMAGE_SIZE[i] - item
+               for i, item in enumerate(self.data.center)]
         max_rad = min(list(self.data.center) + tmp + [i/2 for i in Figure.MAX_SIZE])
         self.data.radius += delta
         self.data.radius = min(self.data.radius,max_rad-1)
@@ -64,8 +70,8 @@ class Figure:
 
     def scale(self, scale: float) -> None:
         """Scales figure by scale times. Clips it to max size, if new size is too large"""
-        center = self.data.center
-        tmp = [512 - item for item in center]
+        center = list(self.data.center)
+        tmp = [constants.IMAGE_SIZE[i] - item for i, item in enumerate(center)]
         max_rad = min(center + tmp + [i/2 for i in Figure.MAX_SIZE])
         self.data.radius *= scale
         self.data.radius = np.clip(self.data.radius, a_min=0, a_max=max_rad)
@@ -90,7 +96,7 @@ class Circle(Figure):
         def copy(self):
             return Circle.CircleData(self.radius,
                                      [i for i in self.center],
-                                     color=self.color[:])
+                                     color=np.copy(self.color))
 
     def __init__(self, data: CircleData):
         super().__init__()
@@ -102,10 +108,14 @@ class Circle(Figure):
         """check the point to be inside the figure"""
         return geo.distance(self.data.center, point) < self.data.radius
 
-    def draw(self, scale=1) -> np.ndarray:
+    def draw(self, scale=1, offset=(0, 0), shape=None) -> np.ndarray:
         """Returns coordinates of circle that can be used for indexing image to
-        fill part of it with color of figure"""
-        return draw.disk((self.data.center[1]*scale, self.data.center[0]*scale), self.data.radius*scale)
+        fill part of it with color of figure.\
+        offset (row, column) is subtracted from scaled coordinates, and they
+        are clipped to shape, if it is given"""
+        center = (self.data.center[1]*scale - offset[0],
+                  self.data.center[0]*scale - offset[1])
+        return draw.disk(center, self.data.radius*scale, shape=shape)
 
     def intersects(self, other: Figure) -> bool:
         """check 2 figures for intersection"""
@@ -129,7 +139,7 @@ class Circle(Figure):
             return dist + radius_2 <= radius_1
         if other.figure_type == FigureType.Rectangle:
             vertices = other.data.vertices()
-            for i in range(0, len(vertices[0])):
+            for i in range(0, len(vertices)):
                 if not self.inside(vertices[i]):
                     return False
             return True
@@ -196,12 +206,14 @@ class Rectangle(Figure):
             raise Exception('You should either provide both'
                             'random as false, and data or neither of them')
 
-    def draw(self, scale=1):
+    def draw(self, scale=1, offset=(0, 0), shape=None):
         """Returns coordinates of rectangle that can be used for indexing image to
-        fill part of it with color of figure"""
-        vertices_x = [i[0]*scale for i in self.data.vertices()]
-        vertices_y = [i[1]*scale for i in self.data.vertices()]
-        return draw.polygon(vertices_y, vertices_x)
+        fill part of it with color of figure.\
+        offset (row, column) is subtracted from scaled coordinates, and they
+        are clipped to shape, if it is given"""
+        vertices_x = [i[0]*scale - offset[1] for i in self.data.vertices()]
+        vertices_y = [i[1]*scale - offset[0] for i in self.data.vertices()]
+        return draw.polygon(vertices_y, vertices_x, shape=shape)
 
     def intersects(self, other: Figure):
         """check 2 figures for intersection"""
@@ -240,20 +252,30 @@ class Rectangle(Figure):
         if other.figure_type == FigureType.Circle:
             if self.inside(other.data.center):
                 vertices = self.data.vertices()
-                # If at least 1 vertice outside- false
-                for i in range(0, len(vertices[0])):
-                    if not other.inside(vertices[i]):
+                # Circle sticks out, if it is closer to any edge than radius
+                prev = vertices[-1]
+                for i in range(0, len(vertices)):
+                    if geo.line_distance(other.data.center,
+                                         [prev, vertices[i]]) < other.data.radius:
                         return False
+                    prev = vertices[i]
                 return True
             return False
         if other.figure_type == FigureType.Rectangle:
             vertices = other.data.vertices()
-            for i in range(0, len(vertices[0])):
+            for i in range(0, len(vertices)):
                 if not self.inside(vertices[i]):
                     return False
             return True
         return False
 
+    def bounds(self) -> (int, int, int, int):
+        """Returns bounding box (x0, y0, x1, y1) of figure, x1 and y1 exclusive"""
+        vertices = self.data.vertices()
+        lower = np.floor(vertices.min(axis=0)).astype(int)
+        upper = np.floor(vertices.max(axis=0)).astype(int) + 1
+        return lower[0], lower[1], upper[0], upper[1]
+
     def rotate(self, degrees: int):
         """rotates self around center on degrees degrees"""
         ang = ((i + degrees)%360 for i in self.data.angles)
@@ -265,37 +287,48 @@ class Rectangle(Figure):
         return Rectangle(self.data.copy())
 
 
-def random_circle(target: np.array, min_rad: int = min(Figure.MIN_SIZE)) -> Circle:
-    """creates and returns random circle"""
-    center = [randint(1, constants.IMAGE_SIZE[i] - 1) for i in range(0, 2)]
+def random_circle(target: np.array, rng: np.random.Generator,
+                  min_rad: int = min(Figure.MIN_SIZE),
+                  table: SummedAreaTable = None) -> Circle:
+    """creates and returns random circle. If summed-area table of target is
+    given, circle takes mean color of its bounding box, else - color of
+    target at its center"""
+    center = [int(i) for i in rng.integers(1, constants.IMAGE_SIZE)]
     color = copy(target[center[1], center[0], :])
-    tmp = [512 - item for item in center]
+    tmp = [constants.IMAGE_SIZE[i] - item for i, item in enumerate(center)]
     max_rad = min(center + tmp + [i/2 for i in Figure.MAX_SIZE])
     if max_rad < min_rad:
-        return random_circle(target, min_rad)
+        return random_circle(target, rng, min_rad, table)
 
-    radius = randint(min_rad, max_rad)
+    radius = int(rng.integers(min_rad, int(max_rad), endpoint=True))
     data = Circle.CircleData(radius, center, color)
-    return Circle(data)
+    circle = Circle(data)
+    if table is not None:
+        circle.data.color = table.region_color(circle.bounds())
+    return circle
 
 
-def random_rectangle(target: np.array) -> Rectangle:
-    """creates and returns random rectangle"""
-    circle = random_circle(target, min_rad=50)
+def random_rectangle(target: np.array, rng: np.random.Generator,
+                     table: SummedAreaTable = None) -> Rectangle:
+    """creates and returns random rectangle, colored as random_circle"""
+    circle = random_circle(target, rng, min_rad=50)
     center = circle.data.center
     radius = circle.data.radius
     color = copy(target[center[1], center[0], :])
-    angle1 = randint(0, 360)
-    angle2 = randint(0, 360)
+    angle1, angle2 = (int(i) for i in rng.integers(0, 360, size=2, endpoint=True))
     if abs(angle1 % 180 - angle2 % 180) < 30:
         angle2 = angle1 + 30
-    return Rectangle(Rectangle.RectangleData(radius, center, (angle1, angle2), color))
+    rectangle = Rectangle(Rectangle.RectangleData(
+        radius, center, (angle1, angle2), color))
+    if table is not None:
+        rectangle.data.color = table.region_color(rectangle.bounds())
+    return rectangle
 
 
-def random_figure(target: np.array) -> Figure:
+def random_figure(target: np.array, rng: np.random.Generator,
+                  table: SummedAreaTable = None) -> Figure:
     """Returns random  suprematism figure"""
-    figures_dict = {
-        FigureType.Circle: random_circle(target),
-        FigureType.Rectangle: random_rectangle(target)}
-    _type = rand.choice(list(FigureType))
-    return figures_dict[_type]
+    _type = list(FigureType)[rng.integers(len(FigureType))]
+    if _type == FigureType.Circle:
+        return random_circle(target, rng, table=table)
+    return random_rectangle(target, rng, table)
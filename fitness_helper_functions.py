@@ -5,6 +5,9 @@ from collections import Counter
 from skimage import transform
 
 from figures import Figure, FigureType
+from pairwise import PairwiseTerms
+from summed_area import SummedAreaTable
+from id_buffer import FigureIdBuffer, invisible_figures
 import geometry_helper_functions as geo
 import constants
 
@@ -17,20 +20,42 @@ NO_SETUP_EXCEPTION = Exception("Call setup_fitness_parameters() first")
 
 PIXEL_NUM = constants.IMAGE_WIDTH * constants.IMAGE_HEIGHT
 
+# Scale of the canvas, rendered for approximation_fitness
+APPROX_SCALE = 0.5
+
 FITNESS_PARAMETERS = {}
 
+# Parameters, that depend only on target and canvas
+BACKGROUND_METRICS = ["MAX_BACKGROUND_CONTRAST", "BG_APPROX"]
+
 
 def setup_fitness_parameters(
         target_image: np.array,
         background_color: np.array,
         canvas: np.array,
-        optimal_figures_number: int = 7):
+        optimal_figures_number: int = 7,
+        background_metrics: dict = None):
+    """Set target and canvas for fitness functions. Background metrics
+    (see BACKGROUND_METRICS) can be given, if they are known for this target
+    and canvas, e.g. from cache"""
     FITNESS_PARAMETERS["OPTIMAL_NUMBER_OF_FIGURES"] = optimal_figures_number
     FITNESS_PARAMETERS["TARGET"] = target_image
+    FITNESS_PARAMETERS["TARGET_TABLE"] = SummedAreaTable(target_image)
     FITNESS_PARAMETERS["CANVAS_COLOR"] = background_color
-    FITNESS_PARAMETERS["MAX_BACKGROUND_CONTRAST"] = max(np.linalg.norm(background_color),
-                                                        np.linalg.norm(np.invert(background_color)))
-    FITNESS_PARAMETERS["BG_APPROX"] = abs(np.sum(target_image - canvas))/(PIXEL_NUM*3)
+    if background_metrics is not None:
+        FITNESS_PARAMETERS.update(background_metrics)
+    else:
+        FITNESS_PARAMETERS["MAX_BACKGROUND_CONTRAST"] = max(np.linalg.norm(background_color),
+                                                            np.linalg.norm(np.invert(background_color)))
+        FITNESS_PARAMETERS["BG_APPROX"] = abs(np.sum(target_image - canvas))/(PIXEL_NUM*3)
+
+    # approximation_fitness lies in [1 - max_metric; 1], as each pixel channel
+    # of rendered canvas differs from target by at most 255
+    rendered_size = int(constants.IMAGE_HEIGHT * APPROX_SCALE) * \
+        int(constants.IMAGE_WIDTH * APPROX_SCALE) * 3
+    max_metric = 255 * rendered_size / (PIXEL_NUM * 3)
+    max_metric /= FITNESS_PARAMETERS["BG_APPROX"]
+    FITNESS_PARAMETERS["MAX_APPROX_MAGNITUDE"] = max(1, max_metric - 1)
 
 def color_difference(color1: np.array, color2: np.array) -> int:
     """Return contrast metric of two colors"""
@@ -39,16 +64,41 @@ def color_difference(color1: np.array, color2: np.array) -> int:
     return np.linalg.norm(color1 - color2)
 
 
-def remove_invisible(figures: List[Figure]) -> None:
+def remove_invisible(figures: List[Figure]) -> List[int]:
     """Remove invisible figures from list, assuming that last figures overlap
-    first ones"""
-    to_be_removed = []
-    for i in range(len(figures)-1, -1, -1):
-        for j in range(i-1, -1, -1):
-            if figures[i].covers(figures[j]):
-                to_be_removed.append(figures[j])
-    for item in set(to_be_removed):
-        figures.remove(item)
+    first ones. Returns indices of removed figures in descending order.\\
+    If ID_BUFFER is set, figures without pixels in figure-ID buffer are
+    removed, otherwise - figures covered by one of the upper figures"""
+    to_be_removed = set()
+    if constants.ID_BUFFER:
+        to_be_removed.update(invisible_figures(figures))
+    else:
+        for i in range(len(figures)-1, -1, -1):
+            for j in range(i-1, -1, -1):
+                if figures[i].covers(figures[j]):
+                    to_be_removed.add(j)
+    removed = sorted(to_be_removed, reverse=True)
+    for index in removed:
+        del figures[index]
+    return removed
+
+
+def figure_color_errors(figures: List[Figure]) -> List[tuple]:
+    """Returns (error, floor) per figure, estimated without rasterizing:
+    RMS difference between figure color and target over figure bounding box,
+    and the smallest such error of any flat color (the box standard
+    deviation)"""
+    if "TARGET_TABLE" not in FITNESS_PARAMETERS:
+        raise NO_SETUP_EXCEPTION
+    table = FITNESS_PARAMETERS["TARGET_TABLE"]
+    errors = []
+    for figure in figures:
+        region = figure.bounds()
+        values = max(table.area(region), 1) * 3
+        error = np.sqrt(table.squared_error(region, figure.data.color) / values)
+        floor = np.sqrt(np.mean(table.variance(region)))
+        errors.append((float(error), float(floor)))
+    return errors
 
 
 def figure_number_fitness(n: int) -> float:
@@ -60,15 +110,23 @@ def figure_number_fitness(n: int) -> float:
     return 1 - abs(n-optimal)/optimal
 
 
-def intersection_fitness(figures: List[Figure]) -> [float, float]:
+def intersection_fitness(figures: List[Figure],
+                         pairwise: PairwiseTerms = None) -> [float, float]:
     """Return pair of two floats [0;1] - metrics of degree of intersection of figures
-    and color contrast between intersecting figures"""
+    and color contrast between intersecting figures.\\
+    If ID_BUFFER is set, pairs of figures, whose visible parts touch in
+    figure-ID buffer, are counted instead of geometric intersections"""
     figure_intersection_fitness = 0
 
-    for i, figure in enumerate(figures):
-        for j in range(i+1, len(figures)):
-            if figure.intersects(figures[j]):
-                figure_intersection_fitness += 1
+    if constants.ID_BUFFER:
+        figure_intersection_fitness = FigureIdBuffer(figures).overlap_count()
+    elif pairwise is not None:
+        figure_intersection_fitness = pairwise.intersection_count()
+    else:
+        for i, figure in enumerate(figures):
+            for j in range(i+1, len(figures)):
+                if figure.intersects(figures[j]):
+                    figure_intersection_fitness += 1
 
     # If we consider figures as nodes, and their intersections as edges then
     # we can use formula for number of nodes in complete graph, that
@@ -83,12 +141,15 @@ def intersection_fitness(figures: List[Figure]) -> [float, float]:
     return min(figure_intersection_fitness, 1)
 
 
-def contrast_fitness(figures: List[Figure]):
+def contrast_fitness(figures: List[Figure], pairwise: PairwiseTerms = None):
     metric = 0
-    for i, figure in enumerate(figures):
-        for j in range(i+1, len(figures)):
-            metric += color_difference(figure.data.color,
-                                       figures[j].data.color)
+    if pairwise is not None:
+        metric = pairwise.contrast_sum()
+    else:
+        for i, figure in enumerate(figures):
+            for j in range(i+1, len(figures)):
+                metric += color_difference(figure.data.color,
+                                           figures[j].data.color)
 
     total = len(figures)*(len(figures) - 1)/2
     # Normalize contrast fitness
@@ -118,15 +179,18 @@ def approximation_fitness(rendered: np.array):
     return 1 - metric
 
 
-def figure_distance_fitness(figures: List[Figure]):
+def figure_distance_fitness(figures: List[Figure], pairwise: PairwiseTerms = None):
     """Return number [0;1]: that reflects how much figures from the list
     far from each other"""
     center_distance_sum = 0
-    for i, figure in enumerate(figures):
-        for j in range(i+1, len(figures)):
-            distance = geo.distance(figure.data.center, figures[j].data.center)
-            radius_sum = figure.data.radius + figures[j].data.radius
-            center_distance_sum += min(distance/radius_sum, 1)
+    if pairwise is not None:
+        center_distance_sum = pairwise.distance_sum()
+    else:
+        for i, figure in enumerate(figures):
+            for j in range(i+1, len(figures)):
+                distance = geo.distance(figure.data.center, figures[j].data.center)
+                radius_sum = figure.data.radius + figures[j].data.radius
+                center_distance_sum += min(distance/radius_sum, 1)
 
     metric = 0
     if center_distance_sum:
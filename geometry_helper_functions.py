@@ -33,6 +33,14 @@ def seg_circle_intersection(circle, segment: [[int, int], [int, int]]) -> bool:
     return False
 
 
+def line_distance(point: [int, int], segment: [[int, int], [int, int]]) -> float:
+    """Returns distance from point to the line, that goes through segment"""
+    direction = np.asarray(segment[1]) - np.asarray(segment[0])
+    relative = np.asarray(point) - np.asarray(segment[0])
+    cross = direction[0] * relative[1] - direction[1] * relative[0]
+    return abs(cross) / np.linalg.norm(direction)
+
+
 def triangle_area(p_1: [int, int], p_2: [int, int], p_3: [int, int]) -> float:
     """Returns area of triangle given by 3 points"""
     char_mat = np.array([
@@ -83,7 +91,7 @@ def pivotal_area(vertices: list, point: [int, int] = None) -> float:
     if point is None:
         point = vertices[0]
     previous_vertex = vertices[0]
-    for i in range(1, len(vertices[0])):
+    for i in range(1, len(vertices)):
         current_vertex = vertices[i]
         area += triangle_area(previous_vertex, current_vertex, point)
         previous_vertex = current_vertex
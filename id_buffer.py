@@ -0,0 +1,60 @@
+"""Figure-ID buffer: topmost figure index per pixel of low resolution canvas"""
+from typing import List
+import numpy as np
+
+from figures import Figure
+import constants
+
+BACKGROUND_ID = -1
+
+
+class FigureIdBuffer:
+    """Rasterized z-buffer of figures. Last figures overlap first ones.\\
+    Visible pixels and overlap adjacency of all figures are computed from
+    one pass over the buffer, by np.bincount reductions"""
+
+    def __init__(self, figures: List[Figure], scale: float = None):
+        scale = scale or constants.ID_BUFFER_SCALE
+        shape = (int(constants.IMAGE_HEIGHT * scale),
+                 int(constants.IMAGE_WIDTH * scale))
+        self.figures_number = len(figures)
+        self.buffer = np.full(shape, BACKGROUND_ID, dtype=np.int32)
+        for i, figure in enumerate(figures):
+            self.buffer[figure.draw(scale, shape=shape)] = i
+
+        # Shift ids by one, so that background gets bin 0
+        ids = self.buffer + 1
+        bins = self.figures_number + 1
+        self.visible_pixels = np.bincount(ids.ravel(), minlength=bins)[1:]
+
+        # Pairs of different ids in horizontally or vertically adjacent pixels
+        first = np.concatenate([ids[:, :-1].ravel(), ids[:-1, :].ravel()])
+        second = np.concatenate([ids[:, 1:].ravel(), ids[1:, :].ravel()])
+        boundary = first != second
+        pairs = np.bincount(first[boundary] * bins + second[boundary],
+                            minlength=bins * bins).reshape(bins, bins)
+        pairs = pairs + pairs.T
+        self.overlaps = pairs[1:, 1:] > 0
+
+    def invisible(self) -> List[int]:
+        """Returns indices of figures without visible pixels in this buffer.\\
+        On a scaled down buffer thin visible parts may be lost, see
+        invisible_figures()"""
+        return np.flatnonzero(self.visible_pixels == 0).tolist()
+
+    def overlap_count(self) -> int:
+        """Number of pairs of figures, whose visible parts touch each other"""
+        return int(np.count_nonzero(self.overlaps)) // 2
+
+
+def invisible_figures(figures: List[Figure], scale: float = None) -> List[int]:
+    """Returns indices of figures without visible pixels on working canvas.\\
+    Candidates are found on a buffer, scaled by scale (ID_BUFFER_SCALE by
+    default), and confirmed on a full resolution one, which is rasterized
+    only if there are candidates"""
+    candidates = FigureIdBuffer(figures, scale).invisible()
+    if not candidates or (scale or constants.ID_BUFFER_SCALE) == 1:
+        return candidates
+    invisible = set(FigureIdBuffer(figures, scale=1).invisible())
+    return [i for i in candidates if i in invisible]
+
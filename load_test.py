@@ -0,0 +1,65 @@
+"""Load test of running job server (server.py): submits LOAD_TEST_JOBS jobs
+over LOAD_TEST_CONCURRENCY connections, reports throughput and latency"""
+import asyncio
+import base64
+import json
+import time
+
+import numpy as np
+
+import constants
+
+
+async def client(image: str, jobs: asyncio.Queue, latencies: list,
+                 outcomes: dict) -> None:
+    """Submit jobs one by one over own connection, until no jobs left"""
+    reader, writer = await asyncio.open_connection(
+        constants.SERVER_HOST, constants.SERVER_PORT,
+        limit=constants.SERVER_MAX_MESSAGE)
+    try:
+        while not jobs.empty():
+            seed = jobs.get_nowait()
+            start = time.perf_counter()
+            writer.write(json.dumps({
+                "op": "submit", "image": image, "seed": seed,
+                "iterations": constants.LOAD_TEST_ITERATIONS}).encode() + b"\n")
+            await writer.drain()
+            while True:
+                event = json.loads(await reader.readline())
+                if event["event"] in ("queued", "started", "progress"):
+                    continue
+                outcomes[event["event"]] = outcomes.get(event["event"], 0) + 1
+                if event["event"] == "done":
+                    latencies.append(time.perf_counter() - start)
+                break
+    finally:
+        writer.close()
+
+
+async def main() -> None:
+    with open(constants.INPUT_IMG_NAME, "rb") as file:
+        image = base64.b64encode(file.read()).decode()
+    jobs = asyncio.Queue()
+    for seed in range(constants.LOAD_TEST_JOBS):
+        jobs.put_nowait(seed)
+    latencies = []
+    outcomes = {}
+
+    start = time.perf_counter()
+    await asyncio.gather(*[client(image, jobs, latencies, outcomes)
+                           for _ in range(constants.LOAD_TEST_CONCURRENCY)])
+    elapsed = time.perf_counter() - start
+
+    print("Jobs:", constants.LOAD_TEST_JOBS, "with",
+          constants.LOAD_TEST_ITERATIONS, "iterations,",
+          constants.LOAD_TEST_CONCURRENCY, "concurrent clients")
+    print("Outcomes:", outcomes)
+    print("Total time:", round(elapsed, 3), "sec")
+    print("Throughput:", round(len(latencies) / elapsed, 3), "jobs/sec")
+    if latencies:
+        print("Latency p50:", round(float(np.percentile(latencies, 50)), 3),
+              "sec, p99:", round(float(np.percentile(latencies, 99)), 3), "sec")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
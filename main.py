@@ -1,104 +1,48 @@
 """Main module of program"""
-import random as rand
 import time
-from pathlib import Path
-import skimage
 
-from skimage import io, transform
-import matplotlib.pyplot as plt
-
-from unit import Unit
-import unit
 import constants
-import preprocessing
-import fitness_helper_functions as fit
-import cv2 as cv
-# Set up the random seed to obtain repeatable results for debug
-if constants.SEED is None:
-    constants.SEED = int(time.time())
-print("seed: ", constants.SEED, "\n")
-rand.seed(constants.SEED)
-
-print("Input reading and preprocessing: Starting")
-launch_time = time.time()
-
-# Read image
-image = cv.imread(constants.INPUT_IMG_NAME,cv.IMREAD_UNCHANGED)
-image = cv.resize(image,(512,512))
-image = cv.cvtColor(image,cv.COLOR_BGR2RGB)
-
-# Create directories for output
-Path("output/combined").mkdir(parents=True, exist_ok=True)
-
-TARGET_IMAGE = preprocessing.rgba2rgb(image)
-# Create canvas
-BLANK_IMAGE = preprocessing.get_blank(
-    preprocessing.get_dominant_color(TARGET_IMAGE))
-
-# Setup fitness function parameters
-fit.setup_fitness_parameters(TARGET_IMAGE, BLANK_IMAGE[0][0], BLANK_IMAGE, 
-optimal_figures_number=12)
-
-print("Input reading and preprocessing: Done in",
-      time.time() - launch_time, "sec")
-
-print("Creating initial generation: Starting")
-gen_start = time.time()
-
-GENERATION = [Unit() for _ in range(constants.START_UNITS)]
+import evolution
+from evolution import Population
 
-print("Creating initial generation: Done in",
-      time.time() - gen_start, "sec")
 
-print("Starting evolutionary loop", f"({constants.ITERATIONS} iterations)")
-one_percent = max(int(constants.ITERATIONS / 100),1)
+def main() -> None:
+    """Evolve picture for INPUT_IMG_NAME and save result"""
+    # Set up the random seed to obtain repeatable results for debug
+    if constants.SEED is None:
+        constants.SEED = int(time.time())
+    print("seed: ", constants.SEED, "\n")
 
-for i in range(0, constants.ITERATIONS):
+    print("Input reading and preprocessing: Starting")
+    launch_time = time.time()
 
-    if i % one_percent == 0 and constants.VERBOSE_MODE:
-        print(f"{i / one_percent}%")
+    target_image, blank_image = evolution.prepare_target()
 
-    # If only one unit left - break
-    if len(GENERATION) < 2:
-        break
+    print("Input reading and preprocessing: Done in",
+          time.time() - launch_time, "sec")
 
-    # Choose 10 random units, then 2 best of them
-    # sample = rand.sample(GENERATION, min(10, len(GENERATION)))
+    print("Creating initial generation: Starting")
+    gen_start = time.time()
 
-    parents = rand.choices(GENERATION,[u.fitness_val for u in GENERATION], k=1)
-    GENERATION.remove(parents[0])
-    parents += rand.choices(GENERATION,[u.fitness_val for u in GENERATION], k=1)
-    GENERATION.remove(parents[1])
+    population = Population(
+        constants.SEED, seed_figures=evolution.warm_start_figures(target_image))
 
-    GENERATION = [i for i in GENERATION if i not in parents]
-    children = parents[0].make_children_with(parents[1])
-    
-    to_be_removed = parents + children
-    to_be_removed = sorted(to_be_removed, key = unit.unit_comparator_metric)
+    print("Creating initial generation: Done in",
+          time.time() - gen_start, "sec")
 
-    GENERATION += to_be_removed[-2: ]
-BEST = None
-BEST_FITNESS = 0
-for item in GENERATION:
-    if (BEST is None) or (item.fitness_val > BEST_FITNESS):
-        BEST = item
-        BEST_FITNESS = item.fitness_val
+    print("Starting evolutionary loop", f"({constants.ITERATIONS} iterations)")
+    population.step(constants.ITERATIONS, verbose=constants.VERBOSE_MODE)
 
-print(BEST.fitness(verbose=True))
+    print(f"Rendering skipped for {population.skipped} of {population.evaluated}",
+          f"children ({population.skip_rate():.1%})")
 
-DPI = 80
-drawn = BEST.draw_unit_on(BLANK_IMAGE, scale=2)
-drawn = transform.resize(drawn,(512,512), anti_aliasing=True)
-drawn = skimage.util.img_as_ubyte(drawn)
+    best = population.best()
+    print(best.fitness(verbose=True))
 
-plt.gcf().set_size_inches(2048/DPI, 1024/DPI)
-plt.subplot(1, 2, 1)
-plt.imshow(drawn)
-plt.subplot(1, 2, 2)
-plt.imshow(TARGET_IMAGE)
-plt.savefig("output/combined/"+str(constants.ITERATIONS)+"x"+str(constants.SEED)+".png")
+    evolution.save_result(best, target_image, blank_image,
+                          str(constants.ITERATIONS)+"x"+str(constants.SEED))
 
 
-io.imsave("output/"+str(constants.ITERATIONS)+"x"+str(constants.SEED)+".png",drawn)
-if constants.SHOW_RESULT:
-    plt.show()
+# Render workers may import this module, so the run is started only from script
+if __name__ == "__main__":
+    main()
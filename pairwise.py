@@ -0,0 +1,118 @@
+"""Cached pairwise fitness terms of unit figures, updated incrementally on mutation"""
+from typing import List
+import numpy as np
+
+from figures import Figure
+
+
+class PairwiseTerms:
+    """Symmetric n x n matrices of intersection, color contrast and distance
+    terms for every pair of figures in a unit.\\
+    Figure i corresponds to row and column i. Diagonals are always zero"""
+
+    def __init__(self, figures: List[Figure]):
+        self.intersections = None
+        self.contrasts = None
+        self.distances = None
+        self.build(figures)
+
+    def __len__(self):
+        return self.contrasts.shape[0]
+
+    def build(self, figures: List[Figure]) -> None:
+        """Compute all three matrices from scratch in one vectorized pass"""
+        n = len(figures)
+        if n == 0:
+            self.intersections = np.zeros((0, 0), dtype=bool)
+            self.contrasts = np.zeros((0, 0), dtype=np.float64)
+            self.distances = np.zeros((0, 0), dtype=np.float64)
+            return
+        centers, radii, colors = _figure_arrays(figures)
+
+        color_delta = colors[:, None, :] - colors[None, :, :]
+        self.contrasts = np.linalg.norm(color_delta, axis=2)
+
+        center_delta = centers[:, None, :] - centers[None, :, :]
+        center_distance = np.linalg.norm(center_delta, axis=2)
+        radius_sum = radii[:, None] + radii[None, :]
+        self.distances = np.minimum(center_distance / radius_sum, 1)
+        np.fill_diagonal(self.distances, 0)
+
+        # Circumscribed circles that do not overlap can not hold intersecting
+        # figures, so exact geometric test is needed only for the rest
+        self.intersections = np.zeros((n, n), dtype=bool)
+        candidates = np.argwhere(np.triu(center_distance < radius_sum, k=1))
+        for i, j in candidates:
+            if figures[i].intersects(figures[j]):
+                self.intersections[i, j] = self.intersections[j, i] = True
+
+    def update(self, figures: List[Figure], k: int) -> None:
+        """Recompute row and column k after figure k has been changed"""
+        centers, radii, colors = _figure_arrays(figures)
+
+        contrasts = np.linalg.norm(colors - colors[k], axis=1)
+        center_distance = np.linalg.norm(centers - centers[k], axis=1)
+        radius_sum = radii + radii[k]
+        distances = np.minimum(center_distance / radius_sum, 1)
+        intersections = np.zeros(len(figures), dtype=bool)
+        for j in np.flatnonzero(center_distance < radius_sum):
+            if j != k:
+                first, second = sorted((j, k))
+                intersections[j] = figures[first].intersects(figures[second])
+        contrasts[k] = distances[k] = 0
+
+        self.contrasts[k, :] = self.contrasts[:, k] = contrasts
+        self.distances[k, :] = self.distances[:, k] = distances
+        self.intersections[k, :] = self.intersections[:, k] = intersections
+
+    def append(self, figures: List[Figure]) -> None:
+        """Grow matrices by one row/column for figure, appended to the end of list"""
+        n = len(figures)
+        self.contrasts = _pad(self.contrasts, n)
+        self.distances = _pad(self.distances, n)
+        self.intersections = _pad(self.intersections, n)
+        self.update(figures, n - 1)
+
+    def remove(self, k: int) -> None:
+        """Drop row and column k after figure k has been removed from list"""
+        self.contrasts = _drop(self.contrasts, k)
+        self.distances = _drop(self.distances, k)
+        self.intersections = _drop(self.intersections, k)
+
+    def permute(self, order: List[int]) -> None:
+        """Reorder matrices after figures were reordered: new figure i is old
+        figure order[i]"""
+        order = np.asarray(order)
+        self.contrasts = self.contrasts[np.ix_(order, order)]
+        self.distances = self.distances[np.ix_(order, order)]
+        self.intersections = self.intersections[np.ix_(order, order)]
+
+    def intersection_count(self) -> int:
+        """Number of intersecting pairs of figures"""
+        return int(np.count_nonzero(self.intersections)) // 2
+
+    def contrast_sum(self) -> float:
+        """Sum of color differences over all pairs of figures"""
+        return float(np.sum(self.contrasts)) / 2
+
+    def distance_sum(self) -> float:
+        """Sum of normalized center distances over all pairs of figures"""
+        return float(np.sum(self.distances)) / 2
+
+
+def _figure_arrays(figures: List[Figure]):
+    """Returns centers, radii and colors of figures as numpy arrays"""
+    centers = np.array([fig.data.center for fig in figures], dtype=np.float64)
+    radii = np.array([fig.data.radius for fig in figures], dtype=np.float64)
+    colors = np.array([fig.data.color for fig in figures], dtype=np.int64)
+    return centers, radii, colors
+
+
+def _pad(matrix: np.array, n: int) -> np.array:
+    ret = np.zeros((n, n), dtype=matrix.dtype)
+    ret[:n-1, :n-1] = matrix
+    return ret
+
+
+def _drop(matrix: np.array, k: int) -> np.array:
+    return np.delete(np.delete(matrix, k, axis=0), k, axis=1)
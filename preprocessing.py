@@ -2,6 +2,9 @@
 import numpy as np
 import cv2
 
+import constants
+import dominant_color
+
 
 def rgba2rgb(rgba: np.array, background=(255, 255, 255)) -> np.array:
     """Converts image with alpha channel to rgb"""
@@ -28,7 +31,13 @@ def rgba2rgb(rgba: np.array, background=(255, 255, 255)) -> np.array:
 
 
 def get_dominant_color(image: np.array) -> np.array:
-    """Returns dominant color of image"""
+    """Returns dominant (the most frequent) color of image"""
+    return dominant_color.dominant_color(image)
+
+
+def get_mean_color(image: np.array) -> np.array:
+    """Returns average color of image, found by k-means with single cluster.\\
+    Was used as dominant color before; slow, kept for comparison"""
     # https://stackoverflow.com/questions/43111029/how-to-find-the-average-colour-of-an-image-in-python-with-opencv
     pixels = np.float32(image.reshape(-1, 3))
 
@@ -42,4 +51,5 @@ def get_dominant_color(image: np.array) -> np.array:
 
 
 def get_blank(color: list) -> np.array:
-    return np.full((512, 512, 3), color)
+    """Returns working canvas filled with given color"""
+    return np.full((constants.IMAGE_HEIGHT, constants.IMAGE_WIDTH, 3), color)
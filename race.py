@@ -0,0 +1,74 @@
+"""Multi-start seed racing: successive halving over independent populations"""
+import time
+
+import constants
+import evolution
+from evolution import Population
+
+
+def main() -> None:
+    """Race RACE_SEEDS populations on INPUT_IMG_NAME and save the winner"""
+    if constants.SEED is None:
+        constants.SEED = int(time.time())
+    seeds = [constants.SEED + i for i in range(constants.RACE_SEEDS)]
+    print("seeds: ", seeds, "\n")
+
+    print("Input reading and preprocessing: Starting")
+    launch_time = time.time()
+
+    # Target and canvas are prepared once and shared by all populations
+    target_image, blank_image = evolution.prepare_target()
+
+    print("Input reading and preprocessing: Done in",
+          time.time() - launch_time, "sec")
+
+    print("Creating initial generations: Starting")
+    gen_start = time.time()
+
+    seed_figures = evolution.warm_start_figures(target_image)
+    populations = [Population(seed, seed_figures=seed_figures)
+                   for seed in seeds]
+    raced = list(populations)
+
+    print("Creating initial generations: Done in",
+          time.time() - gen_start, "sec")
+
+    round_iterations = constants.RACE_ROUND_ITERATIONS
+    round_number = 1
+    while len(raced) > 1:
+        print(f"Round {round_number}: {len(raced)} seeds,",
+              f"{round_iterations} iterations each")
+        for population in raced:
+            population.step(round_iterations)
+        raced = sorted(raced, key=lambda p: p.best().fitness_val, reverse=True)
+        raced = raced[:(len(raced) + 1) // 2]
+        round_iterations *= 2
+        round_number += 1
+
+    winner = raced[0]
+    if winner.iterations < constants.ITERATIONS:
+        print(f"Finishing seed {winner.seed}:",
+              f"{constants.ITERATIONS - winner.iterations} iterations")
+        winner.step(constants.ITERATIONS - winner.iterations,
+                    verbose=constants.VERBOSE_MODE)
+
+    print("\nSeed trajectories (iterations: best fitness):")
+    for population in populations:
+        trajectory = ", ".join(f"{iterations}: {fitness:.4f}"
+                               for iterations, fitness in population.trajectory)
+        marker = " <- winner" if population is winner else ""
+        print(f"seed {population.seed}: {trajectory}{marker}")
+    print("Total iterations:", sum(p.iterations for p in populations),
+          "instead of", constants.ITERATIONS * len(populations))
+    print("Rendering skipped for", sum(p.skipped for p in populations), "of",
+          sum(p.evaluated for p in populations), "children\n")
+
+    best = winner.best()
+    print(best.fitness(verbose=True))
+
+    evolution.save_result(best, target_image, blank_image,
+                          str(constants.ITERATIONS)+"x"+str(winner.seed)+"_race")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Tiled rendering of the final picture at output resolution"""
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+import numpy as np
+import skimage
+from skimage import transform
+
+from figures import Figure
+import constants
+
+
+def tiles(width: int, height: int, tile_size: int) -> List[tuple]:
+    """Returns (row, column, tile_height, tile_width) of tiles, covering image"""
+    return [(row, column,
+             min(tile_size, height - row), min(tile_size, width - column))
+            for row in range(0, height, tile_size)
+            for column in range(0, width, tile_size)]
+
+
+def render_tile(figures: List[Figure], background: np.array, scale: float,
+                tile: tuple, supersampling: int = 1) -> np.array:
+    """Rasterize part of picture, given by tile, on its own canvas.\\
+    Figures whose bounding box misses the tile are skipped"""
+    row, column, tile_height, tile_width = tile
+    scale *= supersampling
+    offset = (row * supersampling, column * supersampling)
+    shape = (tile_height * supersampling, tile_width * supersampling)
+    canvas = np.empty(shape + (3,), dtype=np.uint8)
+    canvas[:, :] = background
+    for figure in figures:
+        center_x, center_y = figure.data.center
+        radius = figure.data.radius * scale
+        if center_y*scale + radius < offset[0] or \
+                center_y*scale - radius > offset[0] + shape[0] or \
+                center_x*scale + radius < offset[1] or \
+                center_x*scale - radius > offset[1] + shape[1]:
+            continue
+        canvas[figure.draw(scale, offset, shape)] = figure.data.color
+    if supersampling > 1:
+        canvas = transform.resize(canvas, (tile_height, tile_width),
+                                  anti_aliasing=True)
+        canvas = skimage.util.img_as_ubyte(canvas)
+    return canvas
+
+
+def _render_tile_into(path: str, size: tuple, figures: List[Figure],
+                      background: np.array, scale: float, tile: tuple,
+                      supersampling: int) -> None:
+    """Worker: render one tile and write it into memory-mapped output"""
+    output = np.memmap(path, dtype=np.uint8, mode="r+", shape=size + (3,))
+    row, column, tile_height, tile_width = tile
+    output[row:row + tile_height, column:column + tile_width] = render_tile(
+        figures, background, scale, tile, supersampling)
+    output.flush()
+
+
+def render(figures: List[Figure], background: np.array,
+           width: int = None, height: int = None,
+           tile_size: int = None, workers: int = None,
+           supersampling: int = None) -> np.memmap:
+    """
+    Render figures, given in working canvas coordinates, at output resolution
+
+    Each tile is rasterized independently in a pool of worker processes and
+    written into a memory-mapped array, so the whole picture never has to be
+    held by one process. With workers=1, or if picture fits in one tile, tiles
+    are rendered one by one in the current process. Parameters default to the
+    ones from constants module
+    """
+    width = width or constants.OUTPUT_WIDTH
+    height = height or constants.OUTPUT_HEIGHT
+    tile_size = tile_size or constants.RENDER_TILE_SIZE
+    workers = workers or constants.RENDER_WORKERS
+    supersampling = supersampling or constants.RENDER_SUPERSAMPLING
+    scale = max(width, height) / max(constants.IMAGE_SIZE)
+
+    size = (height, width)
+    handle, path = tempfile.mkstemp(suffix=".raw")
+    os.close(handle)
+    output = np.memmap(path, dtype=np.uint8, mode="w+", shape=size + (3,))
+
+    picture_tiles = tiles(width, height, tile_size)
+    if workers == 1 or len(picture_tiles) == 1:
+        # Rendering in current process, e.g. if it can not have children,
+        # or if starting the pool would cost more than the rendering itself
+        for tile in picture_tiles:
+            _render_tile_into(path, size, figures, background, scale, tile,
+                              supersampling)
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            jobs = [executor.submit(_render_tile_into, path, size, figures,
+                                    background, scale, tile, supersampling)
+                    for tile in picture_tiles]
+            for job in jobs:
+                job.result()
+
+    # File is unlinked right away, mapping stays valid until output is freed
+    os.remove(path)
+    return output
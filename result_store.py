@@ -0,0 +1,148 @@
+"""Local store of previous results, used to warm-start new runs on similar targets"""
+import json
+import os
+from pathlib import Path
+from typing import List
+import numpy as np
+import cv2 as cv
+
+from figures import Figure, FigureType, Circle, Rectangle
+from summed_area import SummedAreaTable
+import constants
+
+HISTOGRAM_BINS = 4
+THUMBNAIL_SIZE = 8
+# Thumbnail part of descriptor is scaled down, so that it weighs about the
+# same as the color histogram, which sums to 1
+THUMBNAIL_WEIGHT = 1 / THUMBNAIL_SIZE
+DESCRIPTOR_LENGTH = HISTOGRAM_BINS ** 3 + THUMBNAIL_SIZE ** 2 * 3
+
+
+def descriptor(target: np.array) -> np.array:
+    """Returns compact descriptor of image: normalized color histogram
+    followed by low resolution thumbnail"""
+    pixels = target.reshape(-1, 3).astype(np.int64) * HISTOGRAM_BINS // 256
+    packed = (pixels[:, 0] * HISTOGRAM_BINS + pixels[:, 1]) * HISTOGRAM_BINS \
+        + pixels[:, 2]
+    histogram = np.bincount(packed, minlength=HISTOGRAM_BINS ** 3)
+    histogram = histogram / len(packed)
+
+    thumbnail = cv.resize(target, (THUMBNAIL_SIZE, THUMBNAIL_SIZE),
+                          interpolation=cv.INTER_AREA)
+    thumbnail = thumbnail.ravel() / 255 * THUMBNAIL_WEIGHT
+
+    return np.concatenate([histogram, thumbnail]).astype(np.float32)
+
+
+def figure_to_record(figure: Figure) -> dict:
+    """Serialize figure in coordinates, relative to working canvas size"""
+    size = constants.IMAGE_SIZE
+    record = {
+        "type": figure.figure_type.name,
+        "center": [float(figure.data.center[i]) / size[i] for i in range(0, 2)],
+        "radius": float(figure.data.radius) / min(size),
+        "color": [int(i) for i in figure.data.color]
+    }
+    if figure.figure_type == FigureType.Rectangle:
+        record["angles"] = [float(i) for i in figure.data.angles]
+    return record
+
+
+def figure_from_record(record: dict, target: np.array,
+                       table: SummedAreaTable = None,
+                       recolor: bool = True) -> Figure:
+    """Create figure from record on current working canvas. If recolor is set,
+    figure is colored from target, in the same way as random figures are,
+    otherwise it keeps the stored color"""
+    size = constants.IMAGE_SIZE
+    center = [min(max(int(record["center"][i] * size[i]), 1), size[i] - 1)
+              for i in range(0, 2)]
+    radius = record["radius"] * min(size)
+    if recolor:
+        color = np.copy(target[center[1], center[0], :])
+    else:
+        color = np.uint8(record["color"])
+    if record["type"] == FigureType.Rectangle.name:
+        figure = Rectangle(Rectangle.RectangleData(
+            radius, center, tuple(record["angles"]), color))
+    else:
+        figure = Circle(Circle.CircleData(radius, center, color))
+    # Fit figure into canvas and size limits
+    figure.delta_scale(0)
+    figure.translate([0, 0])
+    if recolor and table is not None:
+        figure.data.color = table.region_color(figure.bounds())
+    return figure
+
+
+class ResultStore:
+    """Directory with best figure lists of previous runs and descriptors of
+    their targets.\\
+    Nearest neighbor search is a brute-force distance computation over
+    descriptor matrix, which is kept in memory"""
+
+    def __init__(self, path: str = None):
+        self.path = Path(path or constants.RESULT_STORE_DIR)
+        self.entries = []
+        self.descriptors = np.zeros((0, DESCRIPTOR_LENGTH), dtype=np.float32)
+        if (self.path / "entries.json").exists():
+            with open(self.path / "entries.json") as file:
+                self.entries = json.load(file)
+            self.descriptors = np.load(self.path / "descriptors.npy")
+            # Files are replaced one after another, so an interrupted add()
+            # may leave one extra entry in one of them
+            length = min(len(self.entries), len(self.descriptors))
+            self.entries = self.entries[:length]
+            self.descriptors = self.descriptors[:length]
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, name: str, target: np.array, best: List[Figure]) -> None:
+        """Store figure list of run result together with its target descriptor.\\
+        Files are written under temporary names and renamed, so that they are
+        never left partially written"""
+        self.entries.append({
+            "name": name,
+            "figures": [figure_to_record(fig) for fig in best]
+        })
+        self.descriptors = np.vstack([self.descriptors, descriptor(target)])
+
+        self.path.mkdir(parents=True, exist_ok=True)
+        suffix = f".{os.getpid()}.tmp"
+        entries_path = self.path / "entries.json"
+        descriptors_path = self.path / "descriptors.npy"
+        with open(str(descriptors_path) + suffix, "wb") as file:
+            np.save(file, self.descriptors)
+        with open(str(entries_path) + suffix, "w") as file:
+            json.dump(self.entries, file)
+        os.replace(str(descriptors_path) + suffix, descriptors_path)
+        os.replace(str(entries_path) + suffix, entries_path)
+
+    def nearest(self, target: np.array, k: int = 1,
+                max_distance: float = None) -> List[tuple]:
+        """Returns up to k (entry, descriptor distance) pairs with targets,
+        closest to given one. If max_distance is given, farther entries are
+        not returned"""
+        if not self.entries:
+            return []
+        distances = np.linalg.norm(self.descriptors - descriptor(target), axis=1)
+        k = min(k, len(self.entries))
+        closest = np.argpartition(distances, k - 1)[:k]
+        closest = closest[np.argsort(distances[closest])]
+        if max_distance is not None:
+            closest = closest[distances[closest] <= max_distance]
+        return [(self.entries[i], float(distances[i])) for i in closest]
+
+    def seed_figures(self, target: np.array, k: int = 1,
+                     table: SummedAreaTable = None,
+                     max_distance: float = None,
+                     recolor_distance: float = 0) -> List[List[Figure]]:
+        """Returns figure lists of up to k nearest results, adapted to target.\\
+        Results of targets not farther than recolor_distance (i.e. of the
+        same or almost the same target) keep their own colors, others are
+        recolored from target"""
+        return [[figure_from_record(record, target, table,
+                                    recolor=distance > recolor_distance)
+                 for record in entry["figures"]]
+                for entry, distance in self.nearest(target, k, max_distance)]
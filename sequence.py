@@ -0,0 +1,83 @@
+"""Sequence mode: turn video or directory of frames into suprematism animation.\\
+Each frame continues evolution of the previous frame population"""
+import time
+from pathlib import Path
+
+from skimage import io
+import cv2 as cv
+
+import constants
+import evolution
+import render
+from evolution import Population
+
+IMAGE_EXTENSIONS = {".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff"}
+
+
+def read_frames(source: str):
+    """Yields frames of video file, or images of directory in name order,
+    one by one as BGR(A) arrays. Images, that can not be read, are skipped"""
+    path = Path(source)
+    if path.is_dir():
+        for frame_path in sorted(path.iterdir()):
+            if frame_path.suffix.lower() not in IMAGE_EXTENSIONS:
+                continue
+            frame = cv.imread(str(frame_path), cv.IMREAD_UNCHANGED)
+            if frame is None:
+                print("Warning: can not read", frame_path, "- frame skipped")
+                continue
+            yield frame
+        return
+    capture = cv.VideoCapture(source)
+    try:
+        while True:
+            success, frame = capture.read()
+            if not success:
+                break
+            yield frame
+    finally:
+        capture.release()
+
+
+def main() -> None:
+    """Evolve pictures for frames of SEQUENCE_INPUT and save them"""
+    if constants.SEED is None:
+        constants.SEED = int(time.time())
+    print("seed: ", constants.SEED, "\n")
+
+    Path(constants.SEQUENCE_OUTPUT_DIR).mkdir(parents=True, exist_ok=True)
+
+    population = None
+    background = None
+    launch_time = time.time()
+    for frame_number, frame in enumerate(read_frames(constants.SEQUENCE_INPUT)):
+        frame_start = time.time()
+        # Canvas color of the first frame is kept for the whole sequence
+        target_image, blank_image = evolution.setup_target(frame, background)
+        background = blank_image[0][0]
+
+        if population is None:
+            population = Population(
+                constants.SEED,
+                seed_figures=evolution.warm_start_figures(target_image))
+            population.step(constants.ITERATIONS)
+        else:
+            population.retarget()
+            population.step(constants.SEQUENCE_ITERATIONS)
+
+        drawn = render.render(population.best().figures, background)
+        io.imsave(f"{constants.SEQUENCE_OUTPUT_DIR}/frame_{frame_number:05d}.png",
+                  drawn, check_contrast=False)
+        if constants.VERBOSE_MODE:
+            print(f"Frame {frame_number}: fitness",
+                  population.best().fitness_val,
+                  "done in", time.time() - frame_start, "sec")
+
+    if population is None:
+        print("No frames found in", constants.SEQUENCE_INPUT)
+    else:
+        print("Sequence done in", time.time() - launch_time, "sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""Local asynchronous job server with warm worker processes.
+
+Protocol: JSON objects, one per line, over TCP on SERVER_HOST:SERVER_PORT.\\
+Requests:\\
+{"op": "submit", "image": <base64 encoded image file>, "seed": int,
+"iterations": int, "start_units": int, "deadline": seconds} - all but image
+are optional;\\
+{"op": "cancel", "job": id}.\\
+Events, sent back to the submitting connection:\\
+queued, rejected (queue is full or request is invalid), started, progress,
+done (with base64 encoded png), cancelled, deadline, error. Every event
+carries job id, which is null for lines, that are not requests at all
+"""
+import asyncio
+import base64
+import binascii
+import itertools
+import json
+import multiprocessing
+import time
+import traceback
+
+import constants
+
+
+def worker_main(tasks, events, cancel_event) -> None:
+    """Worker process: keeps modules imported, runs jobs one by one.\\
+    Cancel event and deadline are checked every SERVER_PROGRESS_ITERATIONS"""
+    import numpy as np
+    import cv2 as cv
+    import evolution
+    import render
+    from evolution import Population
+
+    while True:
+        task = tasks.recv()
+        if task is None:
+            return
+        job_id, image, params = task
+        try:
+            _, blank_image = evolution.load_target(image)
+            population = Population(params.get("seed", 0),
+                                    start_units=params.get("start_units"))
+            iterations = params.get("iterations", constants.ITERATIONS)
+            deadline = params.get("deadline")
+            status = "done"
+            while population.iterations < iterations:
+                if cancel_event.is_set():
+                    status = "cancelled"
+                    break
+                if deadline is not None and time.time() > deadline:
+                    status = "deadline"
+                    break
+                population.step(min(constants.SERVER_PROGRESS_ITERATIONS,
+                                    iterations - population.iterations))
+                events.send({"event": "progress", "job": job_id,
+                             "iterations": population.iterations,
+                             "fitness": population.best().fitness_val})
+            if status != "done":
+                events.send({"event": status, "job": job_id})
+                continue
+            best = population.best()
+            drawn = render.render(best.figures, blank_image[0][0], workers=1)
+            _, png = cv.imencode(".png", cv.cvtColor(np.asarray(drawn),
+                                                     cv.COLOR_RGB2BGR))
+            events.send({"event": "done", "job": job_id,
+                         "fitness": best.fitness_val,
+                         "iterations": population.iterations,
+                         "image": base64.b64encode(png.tobytes()).decode()})
+        except Exception as error:  # pylint: disable=broad-except
+            events.send({"event": "error", "job": job_id, "reason": str(error)})
+
+
+def parse_submit(request: dict):
+    """Returns image file content and job parameters of submit request.\\
+    Raises ValueError with the reason, if request is malformed"""
+    if not isinstance(request.get("image"), str):
+        raise ValueError("image must be a base64 string")
+    try:
+        image = base64.b64decode(request["image"], validate=True)
+    except binascii.Error as error:
+        raise ValueError("image is not valid base64") from error
+    params = {}
+    for key, minimum in (("seed", 0), ("iterations", 0), ("start_units", 2)):
+        if key not in request:
+            continue
+        value = request[key]
+        if not isinstance(value, int) or isinstance(value, bool) \
+                or value < minimum:
+            raise ValueError(f"{key} must be an integer, at least {minimum}")
+        params[key] = value
+    if "deadline" in request:
+        deadline = request["deadline"]
+        if not isinstance(deadline, (int, float)) or isinstance(deadline, bool):
+            raise ValueError("deadline must be a number of seconds")
+        params["deadline"] = time.time() + deadline
+    return image, params
+
+
+class Job:
+    """Job, submitted by client, and connection to report its events to"""
+
+    def __init__(self, job_id: int, image: bytes, params: dict, writer):
+        self.id = job_id
+        self.image = image
+        self.params = params
+        self.writer = writer
+        self.state = "queued"
+        self.worker = None
+
+    async def send(self, event: dict) -> None:
+        """Send event to client, if it is still connected"""
+        if self.writer.is_closing():
+            return
+        try:
+            self.writer.write(json.dumps(event).encode() + b"\n")
+            await self.writer.drain()
+        except ConnectionError:
+            pass
+
+
+class Worker:
+    """Warm worker process and pipes to talk to it"""
+
+    def __init__(self):
+        # Pipe() returns (receiving, sending) ends
+        worker_tasks, self.tasks = multiprocessing.Pipe(duplex=False)
+        self.events, worker_events = multiprocessing.Pipe(duplex=False)
+        self.cancel_event = multiprocessing.Event()
+        self.process = multiprocessing.Process(
+            target=worker_main,
+            args=(worker_tasks, worker_events, self.cancel_event))
+        self.process.start()
+
+    def stop(self) -> None:
+        """Ask worker to finish and wait for it"""
+        try:
+            self.tasks.send(None)
+        except OSError:
+            # Worker is already dead
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class JobServer:
+    """Accepts jobs from clients into bounded queue, and runs them on warm
+    worker processes"""
+
+    def __init__(self, workers: int = None, queue_size: int = None):
+        self.workers_number = workers or constants.SERVER_WORKERS
+        self.queue_size = queue_size or constants.SERVER_QUEUE_SIZE
+        # Cancelled jobs stay in the queue until dispatcher skips them, so
+        # queue is unbounded, and the limit is checked against live jobs
+        self.queue = asyncio.Queue()
+        self.queued = 0
+        self.jobs = {}
+        self.job_ids = itertools.count(1)
+        self.workers = []
+
+    async def serve(self, host: str = None, port: int = None) -> None:
+        """Start workers and serve clients until cancelled"""
+        self.workers = [Worker() for _ in range(self.workers_number)]
+        dispatchers = [asyncio.create_task(self.dispatch(index))
+                       for index in range(self.workers_number)]
+        server = await asyncio.start_server(
+            self.handle_client, host or constants.SERVER_HOST,
+            port or constants.SERVER_PORT, limit=constants.SERVER_MAX_MESSAGE)
+        print("Serving on", server.sockets[0].getsockname(),
+              "with", self.workers_number, "workers")
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for dispatcher in dispatchers:
+                dispatcher.cancel()
+            for worker in self.workers:
+                worker.stop()
+
+    async def dispatch(self, index: int) -> None:
+        """Feed jobs from queue to worker, forward its events to clients.\\
+        Errors of one job are logged and reported to its client, so that
+        dispatcher itself keeps running"""
+        while True:
+            job = await self.queue.get()
+            if job.state != "queued":
+                continue
+            self.queued -= 1
+            try:
+                await self.run(index, job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:  # pylint: disable=broad-except
+                traceback.print_exc()
+                if job.id in self.jobs:
+                    await self.finish(job, {"event": "error", "job": job.id,
+                                            "reason": str(error)})
+
+    def start_on_worker(self, index: int, job: Job) -> Worker:
+        """Send job to worker. Worker is restarted, if it has died while
+        idle, and job is sent to the new one"""
+        for _ in range(2):
+            worker = self.workers[index]
+            worker.cancel_event.clear()
+            try:
+                worker.tasks.send((job.id, job.image, job.params))
+                return worker
+            except OSError:
+                print("Worker", index, "is dead, restarting it")
+                worker.stop()
+                self.workers[index] = Worker()
+        raise RuntimeError("worker can not be started")
+
+    async def run(self, index: int, job: Job) -> None:
+        """Run job on worker and forward its events to client.\\
+        Worker is restarted, if it dies during the job"""
+        deadline = job.params.get("deadline")
+        if deadline is not None and time.time() > deadline:
+            await self.finish(job, {"event": "deadline", "job": job.id})
+            return
+        job.state = "running"
+        worker = self.start_on_worker(index, job)
+        job.worker = worker
+        await job.send({"event": "started", "job": job.id})
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                event = await loop.run_in_executor(None, worker.events.recv)
+            except EOFError:
+                worker.stop()
+                self.workers[index] = Worker()
+                event = {"event": "error", "job": job.id,
+                         "reason": "worker died"}
+            if event["event"] == "progress":
+                await job.send(event)
+            else:
+                await self.finish(job, event)
+                return
+
+    async def finish(self, job: Job, event: dict) -> None:
+        """Report final event of job and forget it"""
+        job.state = event["event"]
+        self.jobs.pop(job.id, None)
+        await job.send(event)
+
+    async def handle_client(self, reader, writer) -> None:
+        """Read requests of one client connection"""
+        own_jobs = []
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError:
+                    request = None
+                if not isinstance(request, dict):
+                    await Job(None, b"", {}, writer).send(
+                        {"event": "rejected", "job": None,
+                         "reason": "request must be a JSON object"})
+                elif request.get("op") == "submit":
+                    own_jobs.append(await self.submit(request, writer))
+                elif request.get("op") == "cancel":
+                    await self.cancel(request.get("job"))
+        finally:
+            # Jobs of disconnected client are not needed anymore
+            for job_id in own_jobs:
+                await self.cancel(job_id)
+            writer.close()
+
+    async def submit(self, request: dict, writer) -> int:
+        """Put new job into queue, or reject it, if request is malformed or
+        queue is full"""
+        job = Job(next(self.job_ids), b"", {}, writer)
+        try:
+            job.image, job.params = parse_submit(request)
+        except ValueError as error:
+            await job.send({"event": "rejected", "job": job.id,
+                            "reason": str(error)})
+            return job.id
+        if self.queued >= self.queue_size:
+            await job.send({"event": "rejected", "job": job.id,
+                            "reason": "queue is full"})
+            return job.id
+        self.queue.put_nowait(job)
+        self.queued += 1
+        self.jobs[job.id] = job
+        await job.send({"event": "queued", "job": job.id})
+        return job.id
+
+    async def cancel(self, job_id: int) -> None:
+        """Cancel queued or running job"""
+        if not isinstance(job_id, int):
+            return
+        job = self.jobs.get(job_id)
+        if job is None:
+            return
+        if job.state == "queued":
+            self.queued -= 1
+            await self.finish(job, {"event": "cancelled", "job": job.id})
+        elif job.state == "running":
+            # Worker reports cancellation itself, after current chunk
+            job.worker.cancel_event.set()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(JobServer().serve())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,61 @@
+"""Summed-area tables (integral images) for O(1) statistics of image regions"""
+import numpy as np
+
+
+class SummedAreaTable:
+    """Per-channel integral images of image and of its squared values.\\
+    Regions are given as (x0, y0, x1, y1) with exclusive x1, y1, i.e. they
+    cover image[y0:y1, x0:x1]"""
+
+    def __init__(self, image: np.array):
+        image = np.asarray(image, dtype=np.int64)
+        self.height, self.width, channels = image.shape
+        # Leading row and column of zeros make region sums branch-free
+        self.sums = np.zeros((self.height + 1, self.width + 1, channels),
+                             dtype=np.int64)
+        self.squared_sums = np.zeros_like(self.sums)
+        self.sums[1:, 1:] = image.cumsum(axis=0).cumsum(axis=1)
+        self.squared_sums[1:, 1:] = (image ** 2).cumsum(axis=0).cumsum(axis=1)
+
+    def clip(self, region: tuple) -> tuple:
+        """Clip region to image bounds"""
+        x0, y0, x1, y1 = (int(i) for i in region)
+        x0 = min(max(x0, 0), self.width)
+        x1 = min(max(x1, x0), self.width)
+        y0 = min(max(y0, 0), self.height)
+        y1 = min(max(y1, y0), self.height)
+        return x0, y0, x1, y1
+
+    def area(self, region: tuple) -> int:
+        """Number of pixels in region"""
+        x0, y0, x1, y1 = self.clip(region)
+        return (x1 - x0) * (y1 - y0)
+
+    def sum(self, region: tuple, squared: bool = False) -> np.array:
+        """Per-channel sum of pixel values (or their squares) over region"""
+        x0, y0, x1, y1 = self.clip(region)
+        table = self.squared_sums if squared else self.sums
+        return table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]
+
+    def mean(self, region: tuple) -> np.array:
+        """Per-channel mean color of region"""
+        area = max(self.area(region), 1)
+        return self.sum(region) / area
+
+    def variance(self, region: tuple) -> np.array:
+        """Per-channel variance of region"""
+        area = max(self.area(region), 1)
+        mean = self.sum(region) / area
+        return np.maximum(self.sum(region, squared=True) / area - mean ** 2, 0)
+
+    def squared_error(self, region: tuple, color: np.array) -> float:
+        """Sum of squared differences between region and flat color, i.e.
+        error of filling the whole region with that color"""
+        color = np.asarray(color, dtype=np.float64)
+        return float(np.sum(self.sum(region, squared=True)
+                            - 2 * color * self.sum(region)
+                            + self.area(region) * color ** 2))
+
+    def region_color(self, region: tuple) -> np.array:
+        """Color, representative for region - its rounded mean"""
+        return np.uint8(np.round(self.mean(region)))
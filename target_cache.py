@@ -0,0 +1,87 @@
+"""On-disk cache of preprocessed targets, their dominant colors and background
+metrics. Targets are stored as .npy files and memory-mapped on load"""
+import hashlib
+import json
+import os
+from pathlib import Path
+import numpy as np
+
+import constants
+
+# Increase, when preprocessing changes, to invalidate old entries
+CACHE_VERSION = 2
+
+
+class TargetCache:
+    """Directory of cache entries: <key>.npy with target image and <key>.json
+    with its dominant color and background metrics.\\
+    Entries are keyed by hash of image file and preprocessing parameters.
+    Least recently used entries are evicted, when total size exceeds max_bytes"""
+
+    def __init__(self, path: str = None, max_bytes: int = None):
+        self.path = Path(path or constants.TARGET_CACHE_DIR)
+        self.max_bytes = max_bytes or constants.TARGET_CACHE_MAX_BYTES
+
+    @staticmethod
+    def key(data: bytes) -> str:
+        """Returns cache key for image file content under current parameters"""
+        params = json.dumps([CACHE_VERSION, constants.IMAGE_WIDTH,
+                             constants.IMAGE_HEIGHT]).encode()
+        return hashlib.sha256(data + params).hexdigest()
+
+    def load(self, key: str):
+        """Returns (memory-mapped target, dominant color, background metrics)
+        or None, if there is no such entry"""
+        target_path = self.path / (key + ".npy")
+        meta_path = self.path / (key + ".json")
+        try:
+            with open(meta_path) as file:
+                meta = json.load(file)
+            target = np.load(target_path, mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        # Mark entry as recently used
+        os.utime(meta_path)
+        return target, np.uint8(meta["color"]), meta["metrics"]
+
+    def store(self, key: str, target: np.array, color: np.array,
+              metrics: dict) -> None:
+        """Save entry and evict old ones, if cache is too large.\\
+        Files are written under temporary names and renamed, so that parallel
+        readers never see partial entries"""
+        self.path.mkdir(parents=True, exist_ok=True)
+        suffix = f".{os.getpid()}.tmp"
+        target_path = self.path / (key + ".npy")
+        meta_path = self.path / (key + ".json")
+        with open(str(target_path) + suffix, "wb") as file:
+            np.save(file, np.ascontiguousarray(target))
+        with open(str(meta_path) + suffix, "w") as file:
+            json.dump({"color": [int(i) for i in color],
+                       "metrics": {name: float(value)
+                                   for name, value in metrics.items()}}, file)
+        os.replace(str(target_path) + suffix, target_path)
+        os.replace(str(meta_path) + suffix, meta_path)
+        self.evict()
+
+    def evict(self) -> None:
+        """Remove least recently used entries, until cache fits max_bytes"""
+        entries = []
+        total = 0
+        for meta_path in self.path.glob("*.json"):
+            target_path = meta_path.with_suffix(".npy")
+            try:
+                size = meta_path.stat().st_size + target_path.stat().st_size
+                used = meta_path.stat().st_mtime
+            except OSError:
+                continue
+            entries.append((used, size, meta_path, target_path))
+            total += size
+        for _, size, meta_path, target_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            for path in (meta_path, target_path):
+                try:
+                    path.unlink()
+                except OSError:
+                    pass
+            total -= size
@@ -1,28 +1,68 @@
 """"Module that represent selection unit of genetic algorithm"""
 from copy import deepcopy
-import random as rand
-from random import randint
+from typing import List, NamedTuple
 import numpy as np
 import figures
 import geometry_helper_functions as geo
 import fitness_helper_functions as fit
 import constants
 import preprocessing
+from pairwise import PairwiseTerms
+
+class Mutation(NamedTuple):
+    """Pre-drawn random decisions of one mutation. Figure is picked by
+    figure_fraction, so that the draw does not depend on figures number"""
+    action: int
+    figure_fraction: float
+    targeted_color: bool
+    channel: int
+    translation: List[int]
+    rotation: int
+    sign: int
+    rng: np.random.Generator
+
+
+def draw_mutations(rng: np.random.Generator, n: int) -> List[Mutation]:
+    """Draw random decisions of n mutations at once, each as one array call.\
+    Every mutation also receives its own spawned generator for decisions,
+    that can not be drawn in advance (new random figure, shuffle order)"""
+    actions = rng.integers(1, 8, size=n)
+    figure_fractions = rng.random(size=n)
+    targeted_colors = rng.random(size=n) < constants.TARGETED_COLOR_P
+    channels = rng.integers(0, 3, size=n)
+    translations = rng.integers(-30, 31, size=(n, 2))
+    rotations = rng.integers(0, 181, size=n)
+    signs = rng.choice([-1, 1], size=n)
+    return [Mutation(int(actions[i]), float(figure_fractions[i]),
+                     bool(targeted_colors[i]), int(channels[i]),
+                     translations[i].tolist(), int(rotations[i]),
+                     int(signs[i]), child_rng)
+            for i, child_rng in enumerate(rng.spawn(n))]
+
 
 class Unit:
     """Selection Unit that is represented by "z-buffer" of figures.\\
     Each figure is one of the figure types defined in module figure"""
 
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, figures=None, rng: np.random.Generator = None):
         self.figures = []
-        if parent is None:
-            self.generate_figures()
+        self.pairwise = None
+        self.fitness_exact = True
+        if figures is not None:
+            self.figures = figures
+            self.pairwise = PairwiseTerms(self.figures)
+            self.fitness_val = self.fitness()
+        elif parent is None:
+            if rng is None:
+                raise ValueError("rng is required to generate random figures")
+            self.generate_figures(rng)
+            self.pairwise = PairwiseTerms(self.figures)
             self.fitness_val = self.fitness()
 
-    def generate_figures(self):
+    def generate_figures(self, rng: np.random.Generator):
         """Fills self with 10 randomly chosen figures"""
         for _ in range(0, 10):
-            fig = figures.random_figure(fit.FITNESS_PARAMETERS["TARGET"])
+            fig = random_figure(rng)
             self.figures.append(fig)
 
     def draw_unit_on(self, canvas: np.ndarray, scale=1):
@@ -30,33 +70,37 @@ class Unit:
         Draw all figures of the current unit at the canvas
 
         Fill pixels of canvas with color of each figure. Last figures overlap
-        first ones
+        first ones. Parts of figures outside of canvas are clipped
         """
         width, height, _ = (canvas.shape)
         new_shape = (int(width * scale), int(height * scale), 3)
         canvas = np.resize(canvas.copy(), new_shape)
         for figure in self.figures:
-            canvas[figure.draw(scale)] = figure.data.color
+            canvas[figure.draw(scale, shape=new_shape[:2])] = figure.data.color
         return canvas
 
-    def make_children_with(self, other, children_number=2):
+    def make_children_with(self, other, rng: np.random.Generator,
+                           children_number=2, threshold=None):
         """
         Represent the crossover operation of evolutionary algorithm.
 
-        Produce children_number of children
+        Produce children_number of children. Children, whose fitness can not
+        reach threshold, are not rendered (see fitness())
         """
         children = []
         figures_pool = [i.copy() for i in self.figures] + [i.copy()
                                                            for i in other.figures]
-        rand.shuffle(figures_pool)
-        for figure in figures_pool:
-            figure.translate([randint(-20, 20) for i in range(0, 2)])
+        figures_pool = [figures_pool[i] for i in rng.permutation(len(figures_pool))]
+        translations = rng.integers(-20, 21, size=(len(figures_pool), 2))
+        for figure, translation in zip(figures_pool, translations):
+            figure.translate(translation)
 
         # Each child receives equal share of parents' figures
         # i.e 1st child receives figures from 0th to (figures_number / children_number)
         # 2nd child receives figures from (figures_number / children_number) to
         share = int(len(figures_pool)/children_number)
 
+        mutations = draw_mutations(rng, children_number)
         for i in range(0, children_number):
             child = Unit(parent=self)
 
@@ -64,62 +108,77 @@ class Unit:
                 child.figures = figures_pool[i*share:]
             else:
                 child.figures = figures_pool[i*share:(i+1)*share]
+            child.pairwise = PairwiseTerms(child.figures)
 
-            child.mutate()
+            child.mutate(mutations[i], threshold)
             children.append(child)
         return children
 
-    def mutate(self):
+    def mutate(self, mutation: Mutation, threshold=None):
         """
         Represent in-place mutation
 
         Randomly changes figures - either shuffles them, add new to existing ones,
-        remove one,
+        remove one, change color (randomly or towards target colors under figure),
+        move, rotate or scale one. Random decisions are taken from mutation,
+        see draw_mutations()
+
+        Pairwise fitness terms are updated only for the changed figure.
+        Fitness is evaluated lazily against threshold, see fitness()
         """
-        action = randint(1, 7)
+        changed = None
+        action = mutation.action
+        f = int(mutation.figure_fraction * len(self.figures))
         if action == 1 and len(self.figures) > 1:
             # Remove random figure
-            to_be_removed = rand.choice(self.figures)
-            self.figures.remove(to_be_removed)
+            del self.figures[f]
+            self.pairwise.remove(f)
         elif action == 2:
             # Add random figure
-            figure = figures.random_figure(fit.FITNESS_PARAMETERS["TARGET"])
+            figure = random_figure(mutation.rng)
             self.figures.append(figure)
+            self.pairwise.append(self.figures)
         elif action == 3:
             # Change colors
-            f = rand.randint(0, len(self.figures)-1)
-            add = randint(0, 1)
-            comp = rand.randint(0,2)
-            if add == 0:
-                add = -1
-            self.figures[f].data.color[comp] += np.int8(add * 10)
-            self.figures[f].data.color[comp] = np.uint8(self.figures[f].data.color[comp])
+            comp = mutation.channel
+            color = self.figures[f].data.color
+            if mutation.targeted_color:
+                # Step towards mean target color of the figure bounding box
+                table = fit.FITNESS_PARAMETERS["TARGET_TABLE"]
+                region_color = table.mean(self.figures[f].bounds())
+                step = np.clip(region_color[comp] - int(color[comp]), -10, 10)
+                color[comp] = np.uint8(int(color[comp]) + int(step))
+            else:
+                color[comp] += np.int8(mutation.sign * 10)
+                color[comp] = np.uint8(color[comp])
+            changed = f
         elif action == 4:
             # Move figure
-            f = rand.randint(0, len(self.figures)-1)
-            self.figures[f].translate([randint(-30, 30), randint(-30, 30)])
+            self.figures[f].translate(mutation.translation)
+            changed = f
         elif action == 5:
             # Rotate figure
-            f = rand.randint(0, len(self.figures)-1)
-            rot = randint(0, 180)
-            self.figures[f].rotate(rot)
+            self.figures[f].rotate(mutation.rotation)
+            changed = f
         elif action == 6:
-            rand.shuffle(self.figures)
+            order = mutation.rng.permutation(len(self.figures))
+            self.figures = [self.figures[i] for i in order]
+            self.pairwise.permute(order)
         elif action == 7:
             # Scale figure
-            f = rand.randint(0, len(self.figures)-1)
-            add = randint(0, 1)
-            if add == 0:
-                add = -1
-            delta = add*50
+            delta = mutation.sign*50
             self.figures[f].delta_scale(delta)
+            changed = f
+        if changed is not None:
+            self.pairwise.update(self.figures, changed)
         # Delete invisible figures
-        fit.remove_invisible(self.figures)
+        for index in fit.remove_invisible(self.figures):
+            self.pairwise.remove(index)
 
-        self.fitness_val = self.fitness()
+        self.fitness_val = self.fitness(threshold=threshold)
         return self
 
-    def fitness(self, verbose=False):
+    def fitness(self, verbose=False, threshold=None):
         """
         Fitness function
 
@@ -128,6 +187,11 @@ class Unit:
         figures number\n
         number of intersections b/w the figures (more - the better);\n
         degree of similarity with original image (more similar - the better) 
+
+        If threshold is given, cheap terms are computed first. When even the
+        largest possible approximation term can not lift fitness up to
+        threshold, rendering is skipped and this upper bound is returned
+        instead (self.fitness_exact is set to False)
         """
 
         # Number of figures closer to optimal - the better
@@ -136,17 +200,15 @@ class Unit:
         # More intersections - the better
         # AND
         # Contrast between intersecting figures
-        intersection_fitness = fit.intersection_fitness(self.figures)
-
-        contrast_fitness = fit.contrast_fitness(self.figures)
+        if self.pairwise is None:
+            self.pairwise = PairwiseTerms(self.figures)
+        intersection_fitness = fit.intersection_fitness(
+            self.figures, self.pairwise)
 
-        canvas = preprocessing.get_blank(
-            preprocessing.get_dominant_color(
-                fit.FITNESS_PARAMETERS["TARGET"]))
-        approx_fitness = fit.approximation_fitness(
-            self.draw_unit_on(canvas, scale=0.5))
+        contrast_fitness = fit.contrast_fitness(self.figures, self.pairwise)
 
-        figure_distance_fitness = fit.figure_distance_fitness(self.figures)
+        figure_distance_fitness = fit.figure_distance_fitness(
+            self.figures, self.pairwise)
 
         # average centers closer to image center - the better
         center_distance_fitness = fit.center_distance_fitness(self.figures)
@@ -157,16 +219,6 @@ class Unit:
         # Types should be different
         type_fitness = fit.type_fitness(self.figures)
 
-        fitness_vector = [
-            figure_number_fitness,
-            intersection_fitness,
-            figure_distance_fitness,
-            center_distance_fitness,
-            bg_contrast_fitness,
-            approx_fitness,
-            contrast_fitness,
-            type_fitness
-        ]
         weights = [
             2,
             2,
@@ -179,6 +231,37 @@ class Unit:
         ]
         weights = np.asarray(weights, dtype=np.float64)
         weights *= 1/np.linalg.norm(weights)
+
+        self.fitness_exact = True
+        if threshold is not None:
+            bound = np.linalg.norm([
+                figure_number_fitness * weights[0],
+                intersection_fitness * weights[1],
+                figure_distance_fitness * weights[2],
+                center_distance_fitness * weights[3],
+                bg_contrast_fitness * weights[4],
+                fit.FITNESS_PARAMETERS["MAX_APPROX_MAGNITUDE"] * weights[5],
+                contrast_fitness * weights[6],
+                type_fitness * weights[7]
+            ])
+            if bound < threshold:
+                self.fitness_exact = False
+                return bound
+
+        canvas = preprocessing.get_blank(fit.FITNESS_PARAMETERS["CANVAS_COLOR"])
+        approx_fitness = fit.approximation_fitness(
+            self.draw_unit_on(canvas, scale=fit.APPROX_SCALE))
+
+        fitness_vector = [
+            figure_number_fitness,
+            intersection_fitness,
+            figure_distance_fitness,
+            center_distance_fitness,
+            bg_contrast_fitness,
+            approx_fitness,
+            contrast_fitness,
+            type_fitness
+        ]
         ret = np.linalg.norm([item * weights[i]
                               for i, item in enumerate(fitness_vector)])
 
@@ -200,9 +283,23 @@ class Unit:
             print("type_fitness =", type_fitness,
                   "weight =", weights[7])
             print("result = ", ret)
+            print("figure color errors (RMS over bounding box, best flat):")
+            for i, (error, floor) in enumerate(
+                    fit.figure_color_errors(self.figures)):
+                print(f"  {i} {self.figures[i].figure_type.name}:",
+                      f"{error:.1f}, {floor:.1f}")
 
         return ret
 
 
+def random_figure(rng: np.random.Generator) -> figures.Figure:
+    """Returns random figure for current target, colored by region mean
+    if REGION_COLORED_FIGURES is set"""
+    table = None
+    if constants.REGION_COLORED_FIGURES:
+        table = fit.FITNESS_PARAMETERS["TARGET_TABLE"]
+    return figures.random_figure(fit.FITNESS_PARAMETERS["TARGET"], rng, table)
+
+
 def unit_comparator_metric(u: Unit):
     return u.fitness_val